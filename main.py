@@ -1,14 +1,55 @@
 #!/usr/bin/env python3
-import json
-import requests
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+import aiohttp
+import orjson
+from bisect import bisect_left
 from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+import matplotlib
+# Standaard alleen naar waterstanden.png renderen, geen GUI backend opstarten; zie --show.
+# De geconfigureerde backend (MPLBACKEND, anders matplotlibrc of automatisch) eerst onthouden.
+SHOW_BACKEND = os.environ.get("MPLBACKEND") or matplotlib.rcParamsOrig["backend"]
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 from zoneinfo import ZoneInfo
 
 BASE = "https://ddapi20-waterwebservices.rijkswaterstaat.nl"
-URL_CHECK = f"{BASE}/ONLINEWAARNEMINGENSERVICES/CheckWaarnemingenAanwezig"
 URL_OBS = f"{BASE}/ONLINEWAARNEMINGENSERVICES/OphalenWaarnemingen"
+# Vaste delen van de payload; worden alleen gelezen dus alle requests delen dezelfde dicts
+AQUO_METADATA = {
+    type_data: {
+        "AquoMetadata": {
+            "Compartiment": {"Code": "OW"},
+            "Grootheid": {"Code": "WATHTE"},
+            "ProcesType": type_data,
+        }
+    }
+    for type_data in ("meting", "verwachting")
+}
+# Eén gedeelde sessie/connection pool; alle requests gaan naar dezelfde host.
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=20)
+POOL_SIZE = 16
+KEEPALIVE = 30
+# JSON comprimeert goed; aiohttp pakt gzip/deflate zelf uit
+HTTP_HEADERS = {"Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
+RETRY_TOTAL = 2
+RETRY_BACKOFF = 0.3
+RETRY_STATUS = {502, 503, 504}
+RETRY_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+# Response cache op schijf, TTL in seconden per type data
+CACHE_DIR = Path("cache")
+CACHE_TTL = {"meting": 600, "verwachting": 300}
+# Ouder dan dit (seconden) wordt de cache ook bij een fout niet meer gebruikt
+CACHE_MAX_STALE = 6 * 3600
 RED = "\033[31m"
 GREEN = "\033[32m"
 YELLOW = "\033[33m"
@@ -16,7 +57,23 @@ BLUE = "\033[34m"
 ORANGE = "\033[38;5;208m"
 BLACK = "\033[90m"
 RESET = "\033[0m"
+# Alleen kleuren als de output naar een terminal gaat, niet in een pipe/logbestand
+USE_COLOR = sys.stdout.isatty()
+ALARM_STATES = ("GREEN", "YELLOW", "ORANGE", "RED", "BLACK")
+STATE_COLOR = {
+    "GREEN": GREEN,
+    "YELLOW": YELLOW,
+    "ORANGE": ORANGE,
+    "RED": RED,
+    "BLACK": BLACK,
+}
 TZ = ZoneInfo("Europe/Amsterdam")
+# Waterstanden worden als int16 in mm (cm x 10) opgeslagen; dit is de waarde voor "geen meting"
+MISSING = np.iinfo(np.int16).min
+# Waarde die RWS in Waarde_Numeriek zet als er geen meetwaarde is
+RWS_GEEN_WAARDE = 999999999
+# WS_DEBUG=1: volledige API responses tonen als er iets mis is
+DEBUG = bool(os.environ.get("WS_DEBUG"))
 LOCATIONS = {
     "Lobith, Bovenrijn, haven": "lobith.bovenrijn.haven",
     "Driel, boven": "driel.boven",
@@ -37,105 +94,136 @@ def iso(dt: datetime) -> str:
     return dt.isoformat(timespec="milliseconds")
 
 
-def post_json(url: str, payload: dict) -> dict:
-    r = requests.post(url, json=payload, timeout=20)
-    print(f"Getting data from {url}")
-    # 204 No Content = valid request, but no matching data
-    if r.status_code == 204:
-        return {}
+def describe_error(e: BaseException) -> str:
+    # Korte, leesbare omschrijving; repr() van aiohttp fouten bevat de complete request/headers
+    if isinstance(e, aiohttp.ClientResponseError):
+        return f"HTTP {e.status} {e.message}"
+    text = str(e).splitlines()
+    return f"{type(e).__name__}: {text[0]}" if text else type(e).__name__
+
+
+def new_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(limit=POOL_SIZE, keepalive_timeout=KEEPALIVE)
+    return aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT, headers=HTTP_HEADERS)
+
+
+def cache_path(url: str, payload: dict) -> Path:
+    # De Periode schuift elke run een stukje op; binnen de TTL is het vorige antwoord goed genoeg.
+    stable = {k: v for k, v in payload.items() if k != "Periode"}
+    raw = url.encode("utf-8") + orjson.dumps(stable, option=orjson.OPT_SORT_KEYS)
+    return CACHE_DIR / f"{hashlib.blake2b(raw, digest_size=16).hexdigest()}.resp.json"
+
+
+def cache_read(path: Path):
+    # Het bestand is de ruwe response body; de mtime is het moment van ophalen
+    try:
+        return path.stat().st_mtime, orjson.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
 
-    r.raise_for_status()
-    print(f"{r.status_code} - ")
 
-    if not r.text or not r.text.strip():
+def cache_write(path: Path, raw: bytes):
+    CACHE_DIR.mkdir(exist_ok=True)
+    path.write_bytes(raw)
+
+
+async def post_json(session: aiohttp.ClientSession, url: str, payload: dict, ttl: int = 0) -> dict:
+    if not ttl:
+        return await fetch_json(session, url, payload)
+
+    path = cache_path(url, payload)
+    # Bestands-I/O in de default thread pool, zodat de andere requests in de event loop doorlopen
+    entry = await asyncio.to_thread(cache_read, path)
+    if entry and time.time() - entry[0] < ttl:
+        print(f"Using cached data for {url}")
+        return entry[1]
+
+    try:
+        return await fetch_json(session, url, payload, tee=path)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        # ValueError: 200 met een niet-JSON body, bv. een HTML foutpagina van een gateway.
+        # Een 4xx is een fout in onze request (bv. de payload) en mag niet achter oude data verdwijnen.
+        client_fout = isinstance(e, aiohttp.ClientResponseError) and e.status < 500
+        if client_fout or entry is None or time.time() - entry[0] > CACHE_MAX_STALE:
+            raise
+        # Liever oude data dan geen data
+        ts, body = entry
+        age = timedelta(seconds=round(time.time() - ts))
+        print(f"⚠️ {url} faalde ({describe_error(e)}), gebruik VEROUDERDE cache van {datetime.fromtimestamp(ts, TZ)} ({age} oud)")
+        return body
+
+
+async def fetch_json(session: aiohttp.ClientSession, url: str, payload: dict, tee: Path | None = None) -> dict:
+    for attempt in range(RETRY_TOTAL + 1):
+        try:
+            async with session.post(url, json=payload) as r:
+                print(f"Getting data from {url}")
+                # 204 No Content = valid request, but no matching data
+                if r.status == 204:
+                    return {}
+
+                # Tijdelijke gateway fouten: na de backoff hieronder opnieuw proberen
+                if r.status not in RETRY_STATUS or attempt == RETRY_TOTAL:
+                    r.raise_for_status()
+                    print(f"{r.status} - ")
+                    body = await r.read()
+                    break
+        except RETRY_ERRORS as e:
+            # Verbinding of lezen mislukt: net als bij gateway fouten opnieuw proberen
+            if attempt == RETRY_TOTAL:
+                raise
+            print(f"⚠️ {url} faalde ({describe_error(e)}), opnieuw proberen")
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    if not body or not body.strip():
         return {}
 
     try:
-        return r.json()
+        data = orjson.loads(body)
     except ValueError:
         raise ValueError(
             f"Non-JSON response from {url}. Content-Type={r.headers.get('Content-Type')}\n"
-            f"Body (first 1000 chars):\n{r.text[:1000]}"
+            f"Body (first 1000 chars):\n{body.decode('utf-8', 'replace')[:1000]}"
         )
 
+    if tee is not None:
+        # De ontvangen bytes as-is wegschrijven, zonder de geparste data opnieuw te serialiseren
+        await asyncio.to_thread(cache_write, tee, body)
+    return data
 
-def check_waterstand(label: str, location_code: str, type_data: str, days: int):
-    # Waterinfo publiek: ~28 dagen terug, ~2 dagen vooruit.
-    # Voor een simpele beschikbaarheidscheck: neem laatste 2 dagen.
-    # type data == "meting", "verwachting",
-    now = datetime.now(TZ)
-    if type_data == "meting":
-        start = now - timedelta(days=days)
-        end = now
-    elif type_data == "verwachting":
-        start = now
-        end = now + timedelta(days=days)
-    else:
-        return {}
-    # 1) CheckWaarnemingenAanwezig (DD-API20 format) alleen kort:
-    # Expecting:
-    # {
-    #  "Succesvol": true,
-    #  "WaarnemingenAanwezig": "true"
-    # }
-    check_payload = {
-        "LocatieLijst": [{"Code": location_code}],
-        "AquoMetadataLijst": [
-            {
-                "Compartiment": {"Code": "OW"},
-                "Grootheid": {"Code": "WATHTE"},
-            }
-        ],
-        "Periode": {
-            "Begindatumtijd": iso(start),
-            "Einddatumtijd": iso(end),
-        },
-    }
 
-    check_resp = post_json(URL_CHECK, check_payload)
-
-    aanwezig = str(check_resp.get("WaarnemingenAanwezig", "false")).lower() == "true"
-
-    if not aanwezig:
-        print(f"❌ Geen waterstand beschikbaar (WATHTE) voor {label} in de afgelopen 2 dagen")
-        print("   CheckWaarnemingenAanwezig response:")
-        print(json.dumps(check_resp, indent=2, ensure_ascii=False))
-
-    print(f"✅ Waterstand lijkt beschikbaar voor {label} (CheckWaarnemingenAanwezig=true). Haal laatste waarde op...")
-
-    # 2) OphalenWaarnemingen (DD-API20 format)
+async def check_waterstand(session: aiohttp.ClientSession, label: str, location_code: str, type_data: str, periode: dict):
+    # type data == "meting", "verwachting",
+    # periode == {"Begindatumtijd": ..., "Einddatumtijd": ...}, zie periods() in main
+    print(f"Locatie: {label} ({location_code}) - {type_data}")
+    # OphalenWaarnemingen (DD-API20 format). Een lege WaarnemingenLijst betekent
+    # "geen data", dus een aparte CheckWaarnemingenAanwezig is niet nodig.
     obs_payload = {
         "Locatie": {"Code": location_code},
-        "AquoPlusWaarnemingMetadata": {
-            "AquoMetadata": {
-                "Compartiment": {"Code": "OW"},
-                "Grootheid": {"Code": "WATHTE"},
-                "ProcesType": f"{type_data}",
-            }
-        },
-        "Periode": {
-            "Begindatumtijd": iso(start),
-            "Einddatumtijd": iso(end),
-        },
+        "AquoPlusWaarnemingMetadata": AQUO_METADATA[type_data],
+        "Periode": periode,
     }
 
-    obs_resp = post_json(URL_OBS, obs_payload)
-    wlists = obs_resp.get("WaarnemingenLijst", []) or []
+    obs_resp = await post_json(session, URL_OBS, obs_payload, ttl=CACHE_TTL[type_data])
+    wlists = obs_resp.get("WaarnemingenLijst") or ()
     if not wlists:
-        print("⚠️ Check zei dat er data is, maar OphalenWaarnemingen gaf geen WaarnemingenLijst terug.")
-        print(json.dumps(obs_resp, indent=2, ensure_ascii=False)[:100])
+        print(f"❌ Geen waterstand beschikbaar (WATHTE, {type_data}) voor {label}")
+        if DEBUG:
+            print(orjson.dumps(obs_resp, option=orjson.OPT_INDENT_2).decode())
         return
 
     # Neem de eerste lijst, en pak de laatste waarneming (meestal gesorteerd op tijd)
-    waarn = (wlists[0].get("MetingenLijst") or [])
+    waarn = wlists[0].get("MetingenLijst") or ()
     if not waarn:
         print("⚠️ MetingenLijst aanwezig, maar leeg.")
-        print(json.dumps(wlists[0], indent=2, ensure_ascii=False)[:100])
+        if DEBUG:
+            print(orjson.dumps(wlists[0], option=orjson.OPT_INDENT_2).decode())
         return
 
     last = waarn[-1]
     tijd = last.get("Datumtijd")
-    waarde = (last.get("Meetwaarde") or {}).get("Waarde_Numeriek")
+    meetwaarde = last.get("Meetwaarde")
+    waarde = meetwaarde.get("Waarde_Numeriek") if meetwaarde else None
 
     print(f"✅ Waterstand beschikbaar voor {label}")
     print(f"   Tijdstip : {tijd}")
@@ -143,98 +231,140 @@ def check_waterstand(label: str, location_code: str, type_data: str, days: int):
     return wlists
 
 
-def create_print_data(water_data):
-    # Deze functie converteerd de beschrikbare water data in een overzichtelijke vorm
-    print_dict = {'index': {}}
-    for loc_data in water_data:
-        locatie = loc_data['Locatie']['Naam']
-        print_dict.setdefault(locatie, {})
-        print(f"starting measurements for {locatie}")
+def periods(days: int) -> dict:
+    # Waterinfo publiek: ~28 dagen terug, ~2 dagen vooruit.
+    # Eén keer "nu" bepalen; alle locaties gebruiken dezelfde Periode dict per type data.
+    now = datetime.now(TZ)
+    begin, mid, end = iso(now - timedelta(days=days)), iso(now), iso(now + timedelta(days=days))
+    return {
+        "meting": {"Begindatumtijd": begin, "Einddatumtijd": mid},
+        "verwachting": {"Begindatumtijd": mid, "Einddatumtijd": end},
+    }
 
-        if loc_data.get("MetingenLijst"):
-            for meting in loc_data["MetingenLijst"]:
-                timestamp = meting["Tijdstip"][:13]
-                print_dict['index'][timestamp] = {}
-                print_dict[locatie][timestamp] = meting["Meetwaarde"]["Waarde_Numeriek"]
 
-    return print_dict
+def parse_hour(timestamp: str) -> datetime:
+    # "YYYY-MM-DDTHH" direct uit de string halen, zonder de (trage) strptime format parser
+    return datetime(
+        int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]), int(timestamp[11:13]), tzinfo=TZ
+    )
 
 
-def print_table(data: dict):
-    times = list(data["index"].keys())
-    locations = [k for k in data.keys() if k != "index"]
+def create_print_data(water_data):
+    # Deze functie converteerd de beschrikbare water data in een overzichtelijke vorm:
+    # gesorteerde tijden (datetime), locaties en een int16 array [tijd, locatie] in cm x 10,
+    # met MISSING waar geen meting is
+    locations = {}
+    stamps = []
+    cols = []
+    values = []
+    for loc_data in water_data:
+        locatie = loc_data['Locatie']['Naam']
+        col = locations.setdefault(locatie, len(locations))
+        print(f"starting measurements for {locatie}")
 
+        metingen = loc_data.get("MetingenLijst")
+        if metingen:
+            for meting in metingen:
+                meetwaarde = meting.get("Meetwaarde")
+                stamps.append(meting["Tijdstip"][:13])
+                cols.append(col)
+                values.append(meetwaarde.get("Waarde_Numeriek") if meetwaarde else None)
+
+    # Uur-index opbouwen en indelen in één keer in NumPy i.p.v. per meting in Python.
+    # np.unique sorteert de "YYYY-MM-DDTHH" strings, dus de tijden zijn chronologisch.
+    index, rows = np.unique(np.array(stamps, dtype=str), return_inverse=True)
+    cols = np.array(cols, dtype=np.intp)
+    values = np.array(values, dtype=np.float64)  # None -> NaN
+    values[values == RWS_GEEN_WAARDE] = np.nan
+    # Alleen waarden die in int16 passen (MISSING zelf niet); de rest (en NaN) telt als geen meting.
+    # Anders loopt de cast ongemerkt over en wordt een foute waarde een geloofwaardige hoogte.
+    with np.errstate(invalid="ignore"):
+        scaled = np.rint(values * 10)
+    present = (scaled > MISSING) & (scaled <= np.iinfo(np.int16).max)
+    dropped = int((~np.isnan(values) & ~present).sum())
+    if dropped:
+        print(f"⚠️ {dropped} waarden buiten bereik genegeerd")
+
+    arr = np.full((len(index), len(locations)), MISSING, dtype=np.int16)
+    arr[rows[present], cols[present]] = scaled[present]
+
+    times = [parse_hour(t) for t in index.tolist()]
+    return times, list(locations), arr
+
+
+def to_cm(arr: np.ndarray) -> np.ndarray:
+    # int16 (cm x 10) terug naar float32 cm, met NaN waar geen meting is
+    cm = arr.astype(np.float32) / 10.0
+    cm[arr == MISSING] = np.nan
+    return cm
+
+
+def print_table(times: list, locations: list, arr: np.ndarray):
     header = ["Tijd"] + locations
+    labels = [f"{t:%Y-%m-%dT%H}" for t in times]
 
     # Bepaal breedte op basis van Tijd-kolom
-    col_width = max(len("Tijd"), max(len(t) for t in times))
-    widths = [col_width] * len(header)
+    col_width = max(len("Tijd"), max(len(t) for t in labels))
+    num_fmt = f"{{:>{col_width}.1f}}".format
+    empty_cell = " " * col_width
 
     def color(curr, prev, text):
-        if prev is None:
+        if prev is None or not USE_COLOR:
             return text
         if curr > prev:
-            return f"{RED}{text}{RESET}"
+            return RED + text + RESET
         if curr < prev:
-            return f"{GREEN}{text}{RESET}"
-        return f"{BLUE}{text}{RESET}"
-
-    def fmt(row):
-        cells = []
-        for i, (c, w) in enumerate(zip(row, widths)):
-            if i == 0:  # Tijd links
-                cells.append(c.ljust(w))
-            else:  # Getallen rechts
-                cells.append(c.rjust(w))
-        return "| " + " | ".join(cells) + " |"
-
-    sep = "+-" + "-+-".join("-" * w for w in widths) + "-+"
-
-    print(sep)
-    print(fmt(header))
-    print(sep)
-
-    prev_values = {loc: None for loc in locations}
-
-    for t in times:
-        row = [t]
-        for loc in locations:
-            v = data.get(loc, {}).get(t)
-            if v is None:
-                row.append("")
+            return GREEN + text + RESET
+        return BLUE + text + RESET
+
+    sep = "+-" + "-+-".join("-" * col_width for _ in header) + "-+"
+    # Tijd links, getallen rechts
+    head = [header[0].ljust(col_width)] + [h.rjust(col_width) for h in header[1:]]
+    lines = [sep, "| " + " | ".join(head) + " |", sep]
+
+    prev_values = [None] * len(locations)
+
+    # Vergelijken op de int16 waarden, pas bij het formatteren naar cm
+    for t, values in zip(labels, arr.tolist()):
+        cells = [t.ljust(col_width)]
+        for j, v in enumerate(values):
+            if v == MISSING:
+                cells.append(empty_cell)
             else:
-                cell = f"{v:>13.1f}"
-                txt = color(v, prev_values[loc], cell)
-                row.append(txt)
-                prev_values[loc] = v
-        print(fmt(row))
+                cells.append(color(v, prev_values[j], num_fmt(v / 10)))
+                prev_values[j] = v
+        lines.append("| " + " | ".join(cells) + " |")
 
-    print(sep)
+    lines.append(sep)
+    # Hele tabel in één keer wegschrijven i.p.v. een print() per regel
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
-def plot_waterstanden(data: dict, title="Waterstanden"):
+def plot_waterstanden(times: list, locations: list, arr: np.ndarray, title="Waterstanden", show=False):
     now = datetime.now(TZ)
 
-    times = list(data["index"].keys())
-    x = [datetime.strptime(t, "%Y-%m-%dT%H") for t in times]
-
-    locations = [k for k in data.keys() if k != "index"]
-
     plt.figure(figsize=(14, 10))
     # Create Grapfh layout
     ax = plt.gca()
+    ax.xaxis_date(tz=TZ)
     # Major ticks: elke dag om 00:00
-    ax.xaxis.set_major_locator(mdates.DayLocator())
-    ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d"))
+    ax.xaxis.set_major_locator(mdates.DayLocator(tz=TZ))
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d", tz=TZ))
     # Minor ticks: elke 6 uur
-    ax.xaxis.set_minor_locator(mdates.HourLocator(interval=6))
+    ax.xaxis.set_minor_locator(mdates.HourLocator(interval=6, tz=TZ))
     # Rasterlijnen
     ax.grid(which="major", linewidth=1.2)  # dikker (00:00)
     ax.grid(which="minor", linewidth=0.4)  # dunner (6 uur)
 
-    for loc in locations:
-        y = [data.get(loc, {}).get(t, None) for t in times]
-        plt.plot(x, y, marker=".", markersize=3, linewidth=1, label=loc)
+    # Alle locaties als één LineCollection i.p.v. een plt.plot per locatie.
+    # NaN (geen meting) wordt door Matplotlib als onderbreking van de lijn getekend
+    x = mdates.date2num(times)
+    cm = to_cm(arr)
+    colors = plt.get_cmap("tab10")(np.arange(len(locations)) % 10)
+    segments = [np.column_stack([x, cm[:, j]]) for j in range(len(locations))]
+    ax.add_collection(LineCollection(segments, linewidths=1, colors=colors))
+    ax.autoscale_view()
+    handles = [Line2D([], [], color=c, linewidth=1, label=loc) for loc, c in zip(locations, colors)]
 
     plt.axhline(425.0, color="red", linestyle="--", linewidth=1)
     plt.axhline(1100.0, color="red", linestyle="--", linewidth=1)
@@ -244,16 +374,19 @@ def plot_waterstanden(data: dict, title="Waterstanden"):
     plt.ylabel("Waterstand (cm)")
     plt.xticks(rotation=45, ha="right")
     plt.grid(True)
-    plt.legend()
+    plt.legend(handles=handles)
     plt.tight_layout()
     plt.savefig("waterstanden.png", dpi=150, bbox_inches="tight")
-    plt.show()
+    if show:
+        plt.show()
 
-def check_alarms(data: dict):
+def check_alarms(times: list, locations: list, arr: np.ndarray):
     """
 
     Args:
-        data (dict): All water data
+        times (list): Tijden als datetime (rijen van arr)
+        locations (list): Locaties (kolommen van arr)
+        arr (np.ndarray): All water data in cm x 10 (int16), MISSING = geen meting
 
     Returns:
 
@@ -262,81 +395,92 @@ def check_alarms(data: dict):
     alarm_on = False
     now = datetime.now(TZ)
     now = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+    # times is gesorteerd: alles vanaf deze rij is >= now
+    first = bisect_left(times, now)
+    # Naam -> kolom in arr, één keer opbouwen i.p.v. per site door de lijst zoeken
+    columns = {loc: j for j, loc in enumerate(locations)}
     for site in ALARMS:
         alarm_local = "GREEN"
         print(f"  {site}")
-        site_data = data.get(site)
-        if not isinstance(site_data, dict):
+        col = columns.get(site)
+        if col is None:
             print(f"    ⚠️ Geen data gevonden voor alarm-locatie '{site}'.")
             ALARMS[site]["alarm"] = alarm_local
             continue
-        for time, hight in site_data.items():
-            # print(f"{now} <= {datetime.strptime(time, "%Y-%m-%dT%H").replace(tzinfo=TZ)}")
-            if now <= datetime.strptime(time, "%Y-%m-%dT%H").replace(tzinfo=TZ):
-                max_level = float(ALARMS[site]["max_level"])
-                norm_level = float(ALARMS[site]["norm_level"])
-                span = max_level - norm_level
-                h = float(hight)
-
-                # Multi-level warning states based on norm_level + % of (max_level - norm_level)
-                if h >= max_level:
-                    state = "BLACK"
-                elif h >= norm_level + 0.95 * span:
-                    state = "RED"
-                elif h >= norm_level + 0.75 * span:\
-                    state = "ORANGE"
-                elif h >= norm_level + 0.50 * span:
-                    state = "YELLOW"
-                else:
-                    state = "GREEN"
-
-                # Keep the worst state across times for this site
-                order = {"GREEN": 0, "YELLOW": 1, "ORANGE": 2, "RED": 3, "BLACK": 4}
-                if order[state] > order[alarm_local]:
-                    alarm_local = state
-
-                state_color = {
-                    "GREEN": GREEN,
-                    "YELLOW": YELLOW,
-                    "ORANGE": ORANGE,
-                    "RED": RED,
-                    "BLACK": BLACK,
-                }
-
-                if state == "GREEN":
-                    print(f"    {GREEN}OK{RESET} {site}: {time}: {hight}")
-                else:
-                    prefix = f"{state_color.get(state, '')}WARNING {state}{RESET}"
-                    print(
-                        f"    {prefix} {site}: at {time} {hight} "
-                        f"(norm={norm_level}, max={max_level}, span={span})"
-                    )
-                    alarm_on = True
+        max_level = float(ALARMS[site]["max_level"])
+        norm_level = float(ALARMS[site]["norm_level"])
+        span = max_level - norm_level
+
+        heights = arr[first:, col]
+        rows = np.flatnonzero(heights != MISSING)
+        heights = heights[rows]
+
+        # Multi-level warning states based on norm_level + % of (max_level - norm_level)
+        # digitize geeft per hoogte de index in ALARM_STATES: 0=GREEN .. 4=BLACK
+        thresholds = np.array([
+            norm_level + 0.50 * span,
+            norm_level + 0.75 * span,
+            norm_level + 0.95 * span,
+            max_level,
+        ])
+        states = np.digitize(heights, thresholds * 10)
+
+        # Keep the worst state across times for this site
+        if states.size:
+            alarm_local = ALARM_STATES[states.max()]
+
+        if alarm_local == "GREEN":
+            ok = GREEN + "OK" + RESET if USE_COLOR else "OK"
+            print(f"    {ok} {site}: {heights.size} waarden onder {thresholds[0]}")
+
+        for i in np.flatnonzero(states):
+            state = ALARM_STATES[states[i]]
+            tijd = times[first + rows[i]]
+            prefix = f"WARNING {state}"
+            if USE_COLOR:
+                prefix = STATE_COLOR[state] + prefix + RESET
+            print(
+                f"    {prefix} {site}: at {tijd:%Y-%m-%dT%H} {heights[i] / 10} "
+                f"(norm={norm_level}, max={max_level}, span={span})"
+            )
+            alarm_on = True
         ALARMS[site]["alarm"] = alarm_local
     return alarm_on
 
 
-def main():
+async def main(show: bool = False):
+    if show:
+        plt.switch_backend(SHOW_BACKEND)
+    # Alle locaties/types tegelijk ophalen; de wachttijd op het netwerk overlapt dan.
+    # Een fout bij één locatie/type mag de rest niet afbreken: return_exceptions laat alle
+    # requests afronden voordat de sessie sluit, mislukte resultaten worden hieronder overgeslagen.
+    period = periods(30)
+    jobs = [(label, code, t) for label, code in LOCATIONS.items() for t in ("meting", "verwachting")]
+    async with new_session() as session:
+        results = await asyncio.gather(
+            *[check_waterstand(session, label, code, t, period[t]) for label, code, t in jobs],
+            return_exceptions=True,
+        )
+
     waterstanden = []
-    for label, code in LOCATIONS.items():
-        print("\n" + "=" * 60)
-        print(f"Locatie: {label} ({code})")
-        print("=" * 60)
-
-        for t in ("meting", "verwachting"):
-            r = check_waterstand(label, code, t, 30)
-            if isinstance(r, list):
-                waterstanden.extend(r)
-
-    with open("waterstanden.json", "w", encoding="utf-8") as f:
-        json.dump(waterstanden, f, indent=2, ensure_ascii=False)
-
-    printable_dict = create_print_data(waterstanden)
-    # print_table(printable_dict)
-    plot_waterstanden(printable_dict)
-    if check_alarms(printable_dict) is True:
+    for (label, code, t), r in zip(jobs, results):
+        if isinstance(r, Exception):
+            print(f"❌ {label} ({code}) - {t} overgeslagen: {describe_error(r)}")
+        elif isinstance(r, list):
+            waterstanden.extend(r)
+
+    # Compact, zonder indent: ruim de helft kleiner en sneller te schrijven
+    Path("waterstanden.json").write_bytes(orjson.dumps(waterstanden))
+
+    times, locations, arr = create_print_data(waterstanden)
+    # print_table(times, locations, arr)
+    plot_waterstanden(times, locations, arr, show=show)
+    if check_alarms(times, locations, arr) is True:
         print(f"Alarm found: {ALARMS}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Waterstanden van Rijkswaterstaat ophalen en plotten")
+    parser.add_argument("--show", action="store_true", help="toon de grafiek ook in een venster")
+    args = parser.parse_args()
+    asyncio.run(main(show=args.show))